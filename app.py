@@ -7,30 +7,85 @@ Calculadora de Emissões de GEE para Tecnologias de Gestão de Resíduos
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import matplotlib
+matplotlib.use('Agg')  # renderização apenas no servidor (sem backend interativo)
 from scipy.signal import fftconvolve
-from SALib.sample.sobol import sample
-from SALib.analyze.sobol import analyze
-from joblib import Parallel, delayed
+import io
 import warnings
 from datetime import datetime
-from matplotlib.ticker import FuncFormatter
+from functools import lru_cache
 
 # =============================================================================
 # CONFIGURAÇÃO INICIAL
 # =============================================================================
 warnings.filterwarnings('ignore')
-np.random.seed(50)  # reprodutibilidade
-plt.rcParams['figure.dpi'] = 150
-sns.set_style("whitegrid")
+
+@lru_cache(maxsize=None)
+def _classe_figura():
+    """Importa e configura Matplotlib/seaborn só quando a primeira figura é criada.
+    
+    seaborn (e o scipy.stats que ele carrega) e matplotlib.figure respondem por boa parte da
+    partida a frio, e a página inicial não desenha nenhum gráfico.
+    """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+    
+    matplotlib.rcParams['figure.dpi'] = 150
+    sns.set_style("whitegrid")
+    return Figure
+
+def _nova_figura(**kwargs):
+    """Cria uma Figure (API orientada a objetos) com a configuração de estilo do app."""
+    return _classe_figura()(**kwargs)
+
+# Cenários de GWP usados no Monte Carlo (otimista: GWP-20, real: GWP-100, pessimista: GWP-500)
+CENARIOS_GWP = {
+    'otimista':  {'ch4': 79.7, 'n2o': 273},
+    'real':      {'ch4': 27.0, 'n2o': 273},
+    'pessimista':{'ch4': 7.2 , 'n2o': 130}
+}
+# Mesma tabela em forma de array (linhas na ordem de CENARIOS_GWP; colunas: CH4, N2O), montada uma única vez
+_INDICE_CENARIOS = pd.Index(list(CENARIOS_GWP))
+_GWP_TABELA = np.array([[c['ch4'], c['n2o']] for c in CENARIOS_GWP.values()])
+_GWP_TABELA.flags.writeable = False
+
+# Espaço de parâmetros da análise de Sobol (limites fixos, compartilhados entre execuções)
+PROBLEMA_SOBOL = {
+    'num_vars': 6,
+    'names': ['T', 'U', 'fCH4', 'fN2O', 'GWP_CH4', 'GWP_N2O'],
+    'bounds': [
+        [20.0, 30.0],               # T (°C)
+        [55.0, 85.0],                # U (%)
+        [0.000107, 0.0013],          # fCH4
+        [0.000739, 0.0092],          # fN2O
+        [7.2, 79.7],                  # GWP_CH4
+        [130.0, 273.0]                # GWP_N2O
+    ]
+}
 
 # Formatadores brasileiros (ponto de milhar e vírgula decimal)
+# Troca ',' <-> '.' numa única passada sobre a string formatada no padrão en-US
+_TROCA_SEPARADORES = str.maketrans(',.', '.,')
+
 def br_format_inteiro(x, pos):
-    return f'{x:,.0f}'.replace(',', 'X').replace('.', ',').replace('X', '.')
+    return f'{x:,.0f}'.translate(_TROCA_SEPARADORES)
 
 def br_format_decimal(x, pos):
-    return f'{x:.4f}'.replace('.', ',')
+    return f'{x:.4f}'.translate(_TROCA_SEPARADORES)
+
+@lru_cache(maxsize=4096)
+def _formatar_br_arredondado(valor_arredondado, casas, negativo):
+    # `negativo` entra na chave só para separar -0.0 de 0.0, que são iguais como chave de dicionário
+    return f'{valor_arredondado:,.{casas}f}'.translate(_TROCA_SEPARADORES)
+
+def formatar_br(valor, casas=1):
+    """Formata um número no padrão brasileiro com o número de casas decimais indicado."""
+    if not np.isfinite(valor):
+        return str(valor)
+    # Chave do cache: round() arredonda corretamente o valor binário exato, como o format faz,
+    # então o valor arredondado produz os mesmos dígitos que o original
+    arredondado = round(float(valor), casas)
+    return _formatar_br_arredondado(arredondado, casas, bool(np.signbit(arredondado)))
 
 # =============================================================================
 # CLASSE PRINCIPAL DE CÁLCULO DE EMISSÕES (MESMA DO SCRIPT ORIGINAL)
@@ -134,6 +189,12 @@ class GHGEmissionCalculator:
         
         # Perfil de N2O para pré-descarte (Feng et al., 2020)
         self.profile_n2o_pre = {1: 0.8623, 2: 0.10, 3: 0.0377}
+        
+        # Perfis em dias após a entrada como vetores (índice 0 = dia da entrada)
+        self.kernel_n2o_landfill = np.array(
+            [self.profile_n2o_landfill.get(d, 0) for d in range(1, max(self.profile_n2o_landfill) + 1)], dtype=float)
+        self.kernel_n2o_pre = np.array(
+            [self.profile_n2o_pre.get(d, 0) for d in range(1, max(self.profile_n2o_pre) + 1)], dtype=float)
     
     def _setup_pre_disposal_emissions(self):
         """Configura fatores de emissão de pré-descarte (Feng et al., 2020)"""
@@ -146,27 +207,18 @@ class GHGEmissionCalculator:
         N2O_pre_mgN_per_kg_day = N2O_pre_mgN_per_kg / 3
         self.N2O_pre_kg_per_kg_day = N2O_pre_mgN_per_kg_day * (44/28) / 1_000_000
     
-    def calculate_landfill_emissions(self, waste_kg_day, k_year, temperature_C, 
-                                    doc_fraction, moisture_fraction, years=20):
-        """Calcula as emissões do aterro usando o método FOD do IPCC."""
-        days = years * 365
-        
+    def _landfill_ch4_daily(self, waste_kg_day, temperature_C, doc_fraction):
+        """Potencial diário de CH4 do resíduo aterrado (kg CH4/dia), IPCC 2006."""
         # Cálculo do DOCf (fração que realmente se decompõe)
         docf = 0.0147 * temperature_C + 0.28
         
         # Potencial de CH4 por kg de resíduo
         ch4_potential_per_kg = (doc_fraction * docf * self.MCF * self.F * (16/12) * (1 - self.Ri) * (1 - self.OX))
         
-        ch4_potential_daily = waste_kg_day * ch4_potential_per_kg
-        
-        # Distribuição de decaimento de primeira ordem
-        t = np.arange(1, days + 1, dtype=float)
-        kernel_ch4 = np.exp(-k_year * (t - 1) / 365.0) - np.exp(-k_year * t / 365.0)
-        daily_inputs = np.ones(days, dtype=float)
-        ch4_emissions = fftconvolve(daily_inputs, kernel_ch4, mode='full')[:days]
-        ch4_emissions *= ch4_potential_daily
-        
-        # Emissões de N2O (Wang et al., 2017)
+        return waste_kg_day * ch4_potential_per_kg
+    
+    def _landfill_n2o_daily(self, waste_kg_day, moisture_fraction):
+        """Emissão diária de N2O do aterro (kg N2O/dia), Wang et al. (2017)."""
         exposed_mass = 100  # kg (assumido para cálculo)
         exposed_hours = 8
         
@@ -182,11 +234,59 @@ class GHGEmissionCalculator:
         E_avg_adjusted = E_avg * moisture_factor
         
         # Emissão diária de N2O (convertida para kg)
-        daily_n2o_kg = (E_avg_adjusted * (44/28) / 1_000_000) * waste_kg_day
+        return (E_avg_adjusted * (44/28) / 1_000_000) * waste_kg_day
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _fod_kernel(k_year, days):
+        """Fração do CH4 potencial emitida em cada dia após a disposição (decaimento de primeira ordem).
         
-        # Distribuição ao longo de 5 dias (perfil do aterro)
-        kernel_n2o = np.array([self.profile_n2o_landfill.get(d, 0) for d in range(1, 6)], dtype=float)
-        n2o_emissions = fftconvolve(np.full(days, daily_n2o_kg), kernel_n2o, mode='full')[:days]
+        Depende só de (k, horizonte), que são fixos em Sobol e Monte Carlo: calculado uma vez e
+        reaproveitado (somente leitura, pois a mesma instância é compartilhada entre chamadas).
+        """
+        # e^(-k(t-1)/365) - e^(-kt/365) = e^(-k(t-1)/365) * (1 - e^(-k/365)), uma única exponencial por dia
+        t = np.arange(days, dtype=float)
+        kernel = np.exp(-k_year * t / 365.0) * -np.expm1(-k_year / 365.0)
+        kernel.flags.writeable = False
+        return kernel
+    
+    def _composting_per_batch(self, waste_kg_day, moisture_fraction, f_ch4, f_n2o):
+        """Emissões por batelada diária de compostagem (kg CH4, kg N2O)."""
+        dry_fraction = 1 - moisture_fraction
+        ch4_per_batch = (waste_kg_day * self.TOC * f_ch4 * (16/12) * dry_fraction)
+        n2o_per_batch = (waste_kg_day * self.TN * f_n2o * (44/28) * dry_fraction)
+        return ch4_per_batch, n2o_per_batch
+    
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _dias_restantes(days):
+        """Vetor (days - j), j = 0..days-1, compartilhado entre chamadas com o mesmo horizonte (somente leitura)."""
+        pesos = days - np.arange(days, dtype=float)
+        pesos.flags.writeable = False
+        return pesos
+    
+    @staticmethod
+    def _convolved_total(kernel, days):
+        """Soma no horizonte de `days` dias da convolução de uma entrada diária unitária com `kernel`."""
+        # Cada entrada do perfil no índice j contribui em (days - j) dias antes do fim do horizonte
+        n = min(len(kernel), days)
+        return np.dot(kernel[:n], GHGEmissionCalculator._dias_restantes(days)[:n])
+    
+    def calculate_landfill_emissions(self, waste_kg_day, k_year, temperature_C, 
+                                    doc_fraction, moisture_fraction, years=20):
+        """Calcula as emissões do aterro usando o método FOD do IPCC."""
+        days = years * 365
+        
+        ch4_potential_daily = self._landfill_ch4_daily(waste_kg_day, temperature_C, doc_fraction)
+        
+        # Distribuição de decaimento de primeira ordem
+        daily_inputs = np.ones(days, dtype=float)
+        ch4_emissions = fftconvolve(daily_inputs, self._fod_kernel(k_year, days), mode='full')[:days]
+        ch4_emissions *= ch4_potential_daily
+        
+        # Emissões de N2O (Wang et al., 2017), distribuídas ao longo de 5 dias (perfil do aterro)
+        daily_n2o_kg = self._landfill_n2o_daily(waste_kg_day, moisture_fraction)
+        n2o_emissions = fftconvolve(np.full(days, daily_n2o_kg), self.kernel_n2o_landfill, mode='full')[:days]
         
         # Adicionar emissões de pré-descarte
         ch4_pre, n2o_pre = self._calculate_pre_disposal(waste_kg_day, days)
@@ -196,14 +296,10 @@ class GHGEmissionCalculator:
     def _calculate_pre_disposal(self, waste_kg_day, days):
         """Calcula as emissões de pré-descarte (antes da disposição final)"""
         ch4_emissions = np.full(days, waste_kg_day * self.CH4_pre_kg_per_kg_day)
-        n2o_emissions = np.zeros(days)
-        
-        for entry_day in range(days):
-            for days_after, fraction in self.profile_n2o_pre.items():
-                emission_day = entry_day + days_after - 1
-                if emission_day < days:
-                    n2o_emissions[emission_day] += (waste_kg_day * self.N2O_pre_kg_per_kg_day * fraction)
-        
+
+        # Distribuição ao longo dos dias após a entrada (perfil de pré-descarte)
+        n2o_emissions = fftconvolve(np.full(days, waste_kg_day * self.N2O_pre_kg_per_kg_day), self.kernel_n2o_pre, mode='full')[:days]
+
         return ch4_emissions, n2o_emissions
     
     def calculate_vermicomposting_emissions(self, waste_kg_day, moisture_fraction, years=20,
@@ -214,51 +310,34 @@ class GHGEmissionCalculator:
         if f_n2o is None:
             f_n2o = self.f_N2O_vermi
         days = years * 365
-        dry_fraction = 1 - moisture_fraction
         
         # Emissões por batelada (kg do gás)
-        ch4_per_batch = (waste_kg_day * self.TOC * f_ch4 * (16/12) * dry_fraction)
-        n2o_per_batch = (waste_kg_day * self.TN * f_n2o * (44/28) * dry_fraction)
+        ch4_per_batch, n2o_per_batch = self._composting_per_batch(waste_kg_day, moisture_fraction, f_ch4, f_n2o)
         
-        # Inicializar arrays
-        ch4_emissions = np.zeros(days)
-        n2o_emissions = np.zeros(days)
-        
-        # Distribuir as emissões ao longo do período de compostagem
-        for entry_day in range(days):
-            for compost_day in range(self.COMPOSTING_DAYS):
-                emission_day = entry_day + compost_day
-                if emission_day < days:
-                    ch4_emissions[emission_day] += ch4_per_batch * self.profile_ch4_vermi[compost_day]
-                    n2o_emissions[emission_day] += n2o_per_batch * self.profile_n2o_vermi[compost_day]
+        # Distribuir as emissões ao longo do período de compostagem (convolução entrada diária × perfil)
+        ch4_emissions = fftconvolve(np.full(days, ch4_per_batch), self.profile_ch4_vermi, mode='full')[:days]
+        n2o_emissions = fftconvolve(np.full(days, n2o_per_batch), self.profile_n2o_vermi, mode='full')[:days]
         
         return ch4_emissions, n2o_emissions
     
     def calculate_thermophilic_emissions(self, waste_kg_day, moisture_fraction, years=20):
         """Calcula as emissões da compostagem termofílica (frações fixas)"""
         days = years * 365
-        dry_fraction = 1 - moisture_fraction
         
-        ch4_per_batch = (waste_kg_day * self.TOC * self.f_CH4_thermo * (16/12) * dry_fraction)
-        n2o_per_batch = (waste_kg_day * self.TN * self.f_N2O_thermo * (44/28) * dry_fraction)
-        
-        ch4_emissions = np.zeros(days)
-        n2o_emissions = np.zeros(days)
+        ch4_per_batch, n2o_per_batch = self._composting_per_batch(
+            waste_kg_day, moisture_fraction, self.f_CH4_thermo, self.f_N2O_thermo
+        )
         
-        for entry_day in range(days):
-            for compost_day in range(self.COMPOSTING_DAYS):
-                emission_day = entry_day + compost_day
-                if emission_day < days:
-                    ch4_emissions[emission_day] += ch4_per_batch * self.profile_ch4_thermo[compost_day]
-                    n2o_emissions[emission_day] += n2o_per_batch * self.profile_n2o_thermo[compost_day]
+        ch4_emissions = fftconvolve(np.full(days, ch4_per_batch), self.profile_ch4_thermo, mode='full')[:days]
+        n2o_emissions = fftconvolve(np.full(days, n2o_per_batch), self.profile_n2o_thermo, mode='full')[:days]
         
         return ch4_emissions, n2o_emissions
     
     def calculate_avoided_emissions(self, waste_kg_day, k_year, temperature_C, 
                                     doc_fraction, moisture_fraction, years=20,
                                     gwp_ch4=None, gwp_n2o=None,
-                                    f_ch4_vermi=None, f_n2o_vermi=None):
-        """Calcula as emissões evitadas para ambas as tecnologias."""
+                                    f_ch4_vermi=None, f_n2o_vermi=None, ano_inicio=None):
+        """Calcula as emissões evitadas para ambas as tecnologias (séries a partir de 1º de janeiro de `ano_inicio`)."""
         if gwp_ch4 is None:
             gwp_ch4 = self.GWP_CH4_20
         if gwp_n2o is None:
@@ -282,21 +361,40 @@ class GHGEmissionCalculator:
             waste_kg_day, moisture_fraction, years
         )
         
-        # Converter para CO2eq
-        baseline_co2eq = (ch4_landfill * gwp_ch4 + n2o_landfill * gwp_n2o) / 1000
-        vermi_co2eq = (ch4_vermi * gwp_ch4 + n2o_vermi * gwp_n2o) / 1000
-        thermo_co2eq = (ch4_thermo * gwp_ch4 + n2o_thermo * gwp_n2o) / 1000
+        # Converter para CO2eq (fatores kg gás -> t CO2eq calculados uma única vez)
+        gwp_ch4_t = gwp_ch4 / 1000
+        gwp_n2o_t = gwp_n2o / 1000
+        baseline_co2eq = ch4_landfill * gwp_ch4_t + n2o_landfill * gwp_n2o_t
+        vermi_co2eq = ch4_vermi * gwp_ch4_t + n2o_vermi * gwp_n2o_t
+        thermo_co2eq = ch4_thermo * gwp_ch4_t + n2o_thermo * gwp_n2o_t
+        
+        # Totais por gás (kg; linhas: aterro, vermi, termo) e em CO2eq via produto com os fatores de GWP
+        totais_kg = np.array([
+            [ch4_landfill.sum(), n2o_landfill.sum()],
+            [ch4_vermi.sum(), n2o_vermi.sum()],
+            [ch4_thermo.sum(), n2o_thermo.sum()],
+        ])
+        baseline_total, vermi_total, thermo_total = totais_kg @ np.array([gwp_ch4_t, gwp_n2o_t])
         
         # Emissões evitadas totais
-        avoided_vermi = baseline_co2eq.sum() - vermi_co2eq.sum()
-        avoided_thermo = baseline_co2eq.sum() - thermo_co2eq.sum()
+        avoided_vermi = baseline_total - vermi_total
+        avoided_thermo = baseline_total - thermo_total
         
         # Criar série de datas
         days = years * 365
-        ano_inicio = datetime.now().year
+        if ano_inicio is None:
+            ano_inicio = datetime.now().year
         data_inicio = datetime(ano_inicio, 1, 1)
         datas = pd.date_range(start=data_inicio, periods=days, freq='D')
         
+        # Acumulados e reduções calculados direto nos arrays, antes de montar os DataFrames:
+        # as três séries empilhadas são acumuladas no próprio buffer, numa única chamada
+        acumulados = np.vstack([baseline_co2eq, vermi_co2eq, thermo_co2eq])
+        np.cumsum(acumulados, axis=1, out=acumulados)
+        aterro_acum, vermi_acum, thermo_acum = acumulados
+        reducao_vermi_acum, reducao_thermo_acum = aterro_acum - acumulados[1:]
+        anos_dia = datas.year.to_numpy()
+        
         # DataFrame diário detalhado
         df_detalhado = pd.DataFrame({
             'Data': datas,
@@ -306,60 +404,58 @@ class GHGEmissionCalculator:
             'N2O_Vermi_kg_dia': n2o_vermi,
             'CH4_Thermo_kg_dia': ch4_thermo,
             'N2O_Thermo_kg_dia': n2o_thermo,
+            'CH4_Aterro_tCO2eq': ch4_landfill * gwp_ch4_t,
+            'N2O_Aterro_tCO2eq': n2o_landfill * gwp_n2o_t,
+            'CH4_Vermi_tCO2eq': ch4_vermi * gwp_ch4_t,
+            'N2O_Vermi_tCO2eq': n2o_vermi * gwp_n2o_t,
+            'CH4_Thermo_tCO2eq': ch4_thermo * gwp_ch4_t,
+            'N2O_Thermo_tCO2eq': n2o_thermo * gwp_n2o_t,
+            'Total_Aterro_tCO2eq_dia': baseline_co2eq,
+            'Total_Vermi_tCO2eq_dia': vermi_co2eq,
+            'Total_Thermo_tCO2eq_dia': thermo_co2eq,
+            'Total_Aterro_tCO2eq_acum': aterro_acum,
+            'Total_Vermi_tCO2eq_acum': vermi_acum,
+            'Total_Thermo_tCO2eq_acum': thermo_acum,
+            'Reducao_Vermi_tCO2eq_acum': reducao_vermi_acum,
+            'Reducao_Thermo_tCO2eq_acum': reducao_thermo_acum,
+            'Ano': anos_dia,
         })
         
-        # Adicionar colunas de CO2eq
-        for gas in ['CH4_Aterro', 'N2O_Aterro', 'CH4_Vermi', 'N2O_Vermi', 'CH4_Thermo', 'N2O_Thermo']:
-            gwp = gwp_ch4 if 'CH4' in gas else gwp_n2o
-            df_detalhado[f'{gas}_tCO2eq'] = df_detalhado[f'{gas}_kg_dia'] * gwp / 1000
-        
-        df_detalhado['Total_Aterro_tCO2eq_dia'] = df_detalhado['CH4_Aterro_tCO2eq'] + df_detalhado['N2O_Aterro_tCO2eq']
-        df_detalhado['Total_Vermi_tCO2eq_dia'] = df_detalhado['CH4_Vermi_tCO2eq'] + df_detalhado['N2O_Vermi_tCO2eq']
-        df_detalhado['Total_Thermo_tCO2eq_dia'] = df_detalhado['CH4_Thermo_tCO2eq'] + df_detalhado['N2O_Thermo_tCO2eq']
-        
-        df_detalhado['Total_Aterro_tCO2eq_acum'] = df_detalhado['Total_Aterro_tCO2eq_dia'].cumsum()
-        df_detalhado['Total_Vermi_tCO2eq_acum'] = df_detalhado['Total_Vermi_tCO2eq_dia'].cumsum()
-        df_detalhado['Total_Thermo_tCO2eq_acum'] = df_detalhado['Total_Thermo_tCO2eq_dia'].cumsum()
-        
-        df_detalhado['Reducao_Vermi_tCO2eq_acum'] = df_detalhado['Total_Aterro_tCO2eq_acum'] - df_detalhado['Total_Vermi_tCO2eq_acum']
-        df_detalhado['Reducao_Thermo_tCO2eq_acum'] = df_detalhado['Total_Aterro_tCO2eq_acum'] - df_detalhado['Total_Thermo_tCO2eq_acum']
-        
-        df_detalhado['Ano'] = df_detalhado['Data'].dt.year
-        
-        # Resumo anual
-        df_anual = df_detalhado.groupby('Ano').agg({
-            'Total_Aterro_tCO2eq_dia': 'sum',
-            'Total_Vermi_tCO2eq_dia': 'sum',
-            'Total_Thermo_tCO2eq_dia': 'sum',
-        }).reset_index()
-        
-        df_anual['Redução_Vermi_tCO2eq'] = df_anual['Total_Aterro_tCO2eq_dia'] - df_anual['Total_Vermi_tCO2eq_dia']
-        df_anual['Redução_Thermo_tCO2eq'] = df_anual['Total_Aterro_tCO2eq_dia'] - df_anual['Total_Thermo_tCO2eq_dia']
-        df_anual['Redução_Acumulada_Vermi_tCO2eq'] = df_anual['Redução_Vermi_tCO2eq'].cumsum()
-        df_anual['Redução_Acumulada_Thermo_tCO2eq'] = df_anual['Redução_Thermo_tCO2eq'].cumsum()
+        # Resumo anual: os acumulados diários já existem, basta lê-los no último dia de cada ano
+        # (datas ordenadas -> busca binária) e diferenciar entre anos consecutivos
+        anos = np.arange(anos_dia[0], anos_dia[-1] + 1)
+        fim_ano = np.searchsorted(anos_dia, anos, side='right') - 1
+        aterro_anual = np.diff(aterro_acum[fim_ano], prepend=0.0)
+        vermi_anual = np.diff(vermi_acum[fim_ano], prepend=0.0)
+        thermo_anual = np.diff(thermo_acum[fim_ano], prepend=0.0)
         
-        df_anual.rename(columns={
-            'Total_Aterro_tCO2eq_dia': 'Emissões_Baseline_tCO2eq',
-            'Total_Vermi_tCO2eq_dia': 'Emissões_Vermicompostagem_tCO2eq',
-            'Total_Thermo_tCO2eq_dia': 'Emissões_Termofílica_tCO2eq',
-        }, inplace=True)
+        df_anual = pd.DataFrame({
+            'Ano': anos,
+            'Emissões_Baseline_tCO2eq': aterro_anual,
+            'Emissões_Vermicompostagem_tCO2eq': vermi_anual,
+            'Emissões_Termofílica_tCO2eq': thermo_anual,
+            'Redução_Vermi_tCO2eq': aterro_anual - vermi_anual,
+            'Redução_Thermo_tCO2eq': aterro_anual - thermo_anual,
+            'Redução_Acumulada_Vermi_tCO2eq': reducao_vermi_acum[fim_ano],
+            'Redução_Acumulada_Thermo_tCO2eq': reducao_thermo_acum[fim_ano],
+        })
         
         results = {
             'baseline': {
-                'ch4_kg': ch4_landfill.sum(),
-                'n2o_kg': n2o_landfill.sum(),
-                'co2eq_t': baseline_co2eq.sum()
+                'ch4_kg': totais_kg[0, 0],
+                'n2o_kg': totais_kg[0, 1],
+                'co2eq_t': baseline_total
             },
             'vermicomposting': {
-                'ch4_kg': ch4_vermi.sum(),
-                'n2o_kg': n2o_vermi.sum(),
-                'co2eq_t': vermi_co2eq.sum(),
+                'ch4_kg': totais_kg[1, 0],
+                'n2o_kg': totais_kg[1, 1],
+                'co2eq_t': vermi_total,
                 'avoided_co2eq_t': avoided_vermi
             },
             'thermophilic': {
-                'ch4_kg': ch4_thermo.sum(),
-                'n2o_kg': n2o_thermo.sum(),
-                'co2eq_t': thermo_co2eq.sum(),
+                'ch4_kg': totais_kg[2, 0],
+                'n2o_kg': totais_kg[2, 1],
+                'co2eq_t': thermo_total,
                 'avoided_co2eq_t': avoided_thermo
             },
             'comparison': {
@@ -367,7 +463,7 @@ class GHGEmissionCalculator:
                 'superiority_percent': ((avoided_vermi / avoided_thermo) - 1) * 100
             },
             'annual_averages': {
-                'baseline_tco2eq_year': baseline_co2eq.sum() / years,
+                'baseline_tco2eq_year': baseline_total / years,
                 'vermi_avoided_year': avoided_vermi / years,
                 'thermo_avoided_year': avoided_thermo / years
             },
@@ -378,51 +474,96 @@ class GHGEmissionCalculator:
         }
         
         return results
+    
+    def calculate_avoided_totals(self, waste_kg_day, k_year, temperature_C,
+                                 doc_fraction, moisture_fraction, years=20,
+                                 gwp_ch4=None, gwp_n2o=None,
+                                 f_ch4_vermi=None, f_n2o_vermi=None):
+        """Emissões evitadas totais (tCO2eq) de vermicompostagem e termofílica, vetorizadas.
+        
+        Todas as séries diárias são uma entrada constante convoluída com um perfil fixo, então o
+        total no horizonte é a taxa diária vezes a soma truncada do perfil. Temperatura, umidade,
+        GWPs e frações da vermicompostagem podem ser arrays (com broadcasting); k_year e years
+        são escalares. Retorna (evitadas_vermi, evitadas_termo).
+        """
+        if gwp_ch4 is None:
+            gwp_ch4 = self.GWP_CH4_20
+        if gwp_n2o is None:
+            gwp_n2o = self.GWP_N2O_20
+        if f_ch4_vermi is None:
+            f_ch4_vermi = self.f_CH4_vermi
+        if f_n2o_vermi is None:
+            f_n2o_vermi = self.f_N2O_vermi
+        days = years * 365
+        
+        # Aterro (incluindo pré-descarte), em kg de cada gás no horizonte
+        ch4_landfill = (self._landfill_ch4_daily(waste_kg_day, temperature_C, doc_fraction)
+                        * self._convolved_total(self._fod_kernel(k_year, days), days)
+                        + waste_kg_day * self.CH4_pre_kg_per_kg_day * days)
+        n2o_landfill = (self._landfill_n2o_daily(waste_kg_day, moisture_fraction)
+                        * self._convolved_total(self.kernel_n2o_landfill, days)
+                        + waste_kg_day * self.N2O_pre_kg_per_kg_day
+                        * self._convolved_total(self.kernel_n2o_pre, days))
+        
+        # Compostagem, em kg de cada gás no horizonte
+        ch4_batch, n2o_batch = self._composting_per_batch(waste_kg_day, moisture_fraction, f_ch4_vermi, f_n2o_vermi)
+        ch4_vermi = ch4_batch * self._convolved_total(self.profile_ch4_vermi, days)
+        n2o_vermi = n2o_batch * self._convolved_total(self.profile_n2o_vermi, days)
+        
+        ch4_batch, n2o_batch = self._composting_per_batch(waste_kg_day, moisture_fraction,
+                                                          self.f_CH4_thermo, self.f_N2O_thermo)
+        ch4_thermo = ch4_batch * self._convolved_total(self.profile_ch4_thermo, days)
+        n2o_thermo = n2o_batch * self._convolved_total(self.profile_n2o_thermo, days)
+        
+        gwp_ch4_t = np.asarray(gwp_ch4) / 1000
+        gwp_n2o_t = np.asarray(gwp_n2o) / 1000
+        baseline_total = ch4_landfill * gwp_ch4_t + n2o_landfill * gwp_n2o_t
+        avoided_vermi = baseline_total - (ch4_vermi * gwp_ch4_t + n2o_vermi * gwp_n2o_t)
+        avoided_thermo = baseline_total - (ch4_thermo * gwp_ch4_t + n2o_thermo * gwp_n2o_t)
+        
+        return avoided_vermi, avoided_thermo
 
 # =============================================================================
 # FUNÇÕES AUXILIARES PARA ANÁLISE DE SENSIBILIDADE E MONTE CARLO
 # =============================================================================
-def run_sobol_sensitivity(calculator, waste_kg_day, moisture, years=20, n_samples=64):
+# Nas funções memorizadas abaixo, a calculadora entra como `_calculator` e fica fora da chave do
+# cache: seus parâmetros são fixos, então o resultado depende só das entradas numéricas
+@st.cache_data(max_entries=16, show_spinner=False)
+def run_deterministic_analysis(_calculator, waste_kg_day, k_year, temperature, doc_fraction, moisture,
+                               years, gwp_ch4, gwp_n2o, ano_inicio):
+    """Resultados determinísticos (séries diárias e resumo anual) para um cenário de GWP."""
+    return _calculator.calculate_avoided_emissions(
+        waste_kg_day, k_year, temperature, doc_fraction, moisture, years,
+        gwp_ch4=gwp_ch4, gwp_n2o=gwp_n2o, ano_inicio=ano_inicio
+    )
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def run_sobol_sensitivity(_calculator, waste_kg_day, moisture, years=20, n_samples=64):
     """Executa análise de sensibilidade de Sobol sobre emissões evitadas."""
+    # SALib (e o scipy.stats que ele carrega) só é importado quando a análise roda de fato,
+    # aliviando a partida a frio do app
+    from SALib.sample.sobol import sample
+    from SALib.analyze.sobol import analyze
+
     k_fixed = 0.06
     doc_fixed = 0.15
 
-    def vermicomposting_model(params):
-        T, U, fCH4, fN2O, GWP_CH4, GWP_N2O = params
-        results = calculator.calculate_avoided_emissions(
-            waste_kg_day, k_fixed, T, doc_fixed, U/100, years,
-            gwp_ch4=GWP_CH4, gwp_n2o=GWP_N2O,
-            f_ch4_vermi=fCH4, f_n2o_vermi=fN2O
-        )
-        return results['vermicomposting']['avoided_co2eq_t']
-
-    def thermophilic_model(params):
-        T, U, fCH4, fN2O, GWP_CH4, GWP_N2O = params
-        results = calculator.calculate_avoided_emissions(
-            waste_kg_day, k_fixed, T, doc_fixed, U/100, years,
-            gwp_ch4=GWP_CH4, gwp_n2o=GWP_N2O
-        )
-        return results['thermophilic']['avoided_co2eq_t']
-
-    problem = {
-        'num_vars': 6,
-        'names': ['T', 'U', 'fCH4', 'fN2O', 'GWP_CH4', 'GWP_N2O'],
-        'bounds': [
-            [20.0, 30.0],               # T (°C)
-            [55.0, 85.0],                # U (%)
-            [0.000107, 0.0013],          # fCH4
-            [0.000739, 0.0092],          # fN2O
-            [7.2, 79.7],                  # GWP_CH4
-            [130.0, 273.0]                # GWP_N2O
-        ]
-    }
+    # Cópia rasa: o SALib acrescenta chaves ao dicionário do problema
+    problem = dict(PROBLEMA_SOBOL)
 
     param_values = sample(problem, n_samples, seed=50)
-    results_vermi = Parallel(n_jobs=-1)(delayed(vermicomposting_model)(params) for params in param_values)
-    results_thermo = Parallel(n_jobs=-1)(delayed(thermophilic_model)(params) for params in param_values)
 
-    Si_vermi = analyze(problem, np.array(results_vermi), print_to_console=False)
-    Si_thermo = analyze(problem, np.array(results_thermo), print_to_console=False)
+    # Todas as amostras avaliadas de uma vez (colunas da matriz de Saltelli -> arrays de parâmetros);
+    # fCH4/fN2O só afetam a vermicompostagem, a termofílica usa suas frações fixas
+    T, U, fCH4, fN2O, GWP_CH4, GWP_N2O = param_values.T
+    results_vermi, results_thermo = _calculator.calculate_avoided_totals(
+        waste_kg_day, k_fixed, T, doc_fixed, U/100, years,
+        gwp_ch4=GWP_CH4, gwp_n2o=GWP_N2O,
+        f_ch4_vermi=fCH4, f_n2o_vermi=fN2O
+    )
+
+    Si_vermi = analyze(problem, results_vermi, print_to_console=False)
+    Si_thermo = analyze(problem, results_thermo, print_to_console=False)
 
     return {
         'vermi': Si_vermi,
@@ -430,96 +571,96 @@ def run_sobol_sensitivity(calculator, waste_kg_day, moisture, years=20, n_sample
         'problem': problem
     }
 
-def run_monte_carlo_analysis(calculator, waste_kg_day, k, temp, doc, moisture, 
+def generate_mc_parameters(n_simulations, prob_otimista=0.3, prob_real=0.5, prob_pessimista=0.2, seed=50):
+    """Amostra os parâmetros do Monte Carlo (chamada só quando o cache de run_monte_carlo_analysis falha)."""
+    rng = np.random.default_rng(seed)
+    T_mc = rng.uniform(20.0, 30.0, n_simulations)
+    U_mc = rng.uniform(55.0, 85.0, n_simulations)
+    fCH4_mc = rng.uniform(0.000107, 0.0013, n_simulations)
+    fN2O_mc = rng.uniform(0.000739, 0.0092, n_simulations)
+    cenarios_mc = rng.choice(list(CENARIOS_GWP), size=n_simulations,
+                             p=[prob_otimista, prob_real, prob_pessimista])
+    return T_mc, U_mc, fCH4_mc, fN2O_mc, cenarios_mc
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def run_monte_carlo_analysis(_calculator, waste_kg_day, k, temp, doc, moisture, 
                             years=20, n_simulations=100,
                             prob_otimista=0.3, prob_real=0.5, prob_pessimista=0.2):
     """Executa análise de incerteza Monte Carlo."""
-    np.random.seed(50)
-    cenarios = {
-        'otimista':  {'ch4': 79.7, 'n2o': 273},
-        'real':      {'ch4': 27.0, 'n2o': 273},
-        'pessimista':{'ch4': 7.2 , 'n2o': 130}
-    }
-    prob_list = [prob_otimista, prob_real, prob_pessimista]
-    cenario_nomes = list(cenarios.keys())
-
-    results_vermi = []
-    results_thermo = []
-    mc_parameters = []
-
-    k_fixed = k
-    doc_fixed = doc
-
-    for i in range(n_simulations):
-        T_mc = np.random.uniform(20.0, 30.0)
-        U_mc = np.random.uniform(55.0, 85.0)
-        fCH4_mc = np.random.uniform(0.000107, 0.0013)
-        fN2O_mc = np.random.uniform(0.000739, 0.0092)
-
-        cenario = np.random.choice(cenario_nomes, p=prob_list)
-        gwp_ch4 = cenarios[cenario]['ch4']
-        gwp_n2o = cenarios[cenario]['n2o']
-
-        results = calculator.calculate_avoided_emissions(
-            waste_kg_day, k_fixed, T_mc, doc_fixed, U_mc/100, years,
-            gwp_ch4=gwp_ch4, gwp_n2o=gwp_n2o,
-            f_ch4_vermi=fCH4_mc, f_n2o_vermi=fN2O_mc
-        )
+    T_mc, U_mc, fCH4_mc, fN2O_mc, cenarios_mc = generate_mc_parameters(
+        n_simulations, prob_otimista, prob_real, prob_pessimista
+    )
 
-        results_vermi.append(results['vermicomposting']['avoided_co2eq_t'])
-        results_thermo.append(results['thermophilic']['avoided_co2eq_t'])
-
-        mc_parameters.append({
-            'simulacao': i+1,
-            'temperatura': T_mc,
-            'umidade': U_mc,
-            'fCH4': fCH4_mc,
-            'fN2O': fN2O_mc,
-            'cenario_gwp': cenario,
-            'gwp_ch4': gwp_ch4,
-            'gwp_n2o': gwp_n2o
-        })
+    # GWP de cada simulação a partir do cenário sorteado (tabela na ordem de CENARIOS_GWP)
+    gwp_ch4_mc, gwp_n2o_mc = _GWP_TABELA[_INDICE_CENARIOS.get_indexer(cenarios_mc)].T
 
-    mc_params_df = pd.DataFrame(mc_parameters)
-    mc_params_df['vermi_evitadas'] = results_vermi
-    mc_params_df['termo_evitadas'] = results_thermo
+    # Todas as simulações de uma vez pelo núcleo numérico (sem séries diárias nem DataFrames)
+    results_vermi, results_thermo = _calculator.calculate_avoided_totals(
+        waste_kg_day, k, T_mc, doc, U_mc/100, years,
+        gwp_ch4=gwp_ch4_mc, gwp_n2o=gwp_n2o_mc,
+        f_ch4_vermi=fCH4_mc, f_n2o_vermi=fN2O_mc
+    )
+    # Amostragem e modelo em float64; só os arrays guardados (resultados e tabela de parâmetros)
+    # vão para precisão simples, suficiente para a dispersão do Monte Carlo
+    results_vermi = results_vermi.astype(np.float32)
+    results_thermo = results_thermo.astype(np.float32)
+
+    mc_params_df = pd.DataFrame({
+        'simulacao': np.arange(1, n_simulations + 1),
+        'temperatura': T_mc.astype(np.float32),
+        'umidade': U_mc.astype(np.float32),
+        'fCH4': fCH4_mc.astype(np.float32),
+        'fN2O': fN2O_mc.astype(np.float32),
+        'cenario_gwp': cenarios_mc,
+        'gwp_ch4': gwp_ch4_mc.astype(np.float32),
+        'gwp_n2o': gwp_n2o_mc.astype(np.float32),
+        'vermi_evitadas': results_vermi,
+        'termo_evitadas': results_thermo,
+    })
 
-    return np.array(results_vermi), np.array(results_thermo), mc_params_df
+    return results_vermi, results_thermo, mc_params_df
 
 # =============================================================================
 # FUNÇÕES DE VISUALIZAÇÃO (ADAPTADAS PARA STREAMLIT)
 # =============================================================================
+def _plot_hist_kde(ax, dados, cor, rotulo, n_pontos=200):
+    """Histograma com a curva KDE escalada para contagens (equivalente a sns.histplot com kde=True)."""
+    from scipy.stats import gaussian_kde  # importação tardia: só necessária ao desenhar o painel
+
+    contagens, bordas, _ = ax.hist(dados, bins='auto', color=cor, alpha=0.6, label=rotulo)
+    if np.ptp(dados) > 0:
+        grade = np.linspace(bordas[0], bordas[-1], n_pontos)
+        densidade = gaussian_kde(dados)(grade)
+        ax.plot(grade, densidade * len(dados) * (bordas[1] - bordas[0]), color=cor)
+
 def create_dashboard(results, sensitivity, mc_vermi, mc_thermo, total_waste_tons, calculator):
     """Cria e retorna as figuras do painel principal."""
-    fig, axes = plt.subplots(2, 3, figsize=(15, 10))
+    fig = _nova_figura(figsize=(15, 10))
+    axes = fig.subplots(2, 3)
+    evitado_vermi = results['vermicomposting']['avoided_co2eq_t']
+    evitado_thermo = results['thermophilic']['avoided_co2eq_t']
     
     # 1. Comparação de emissões evitadas
     ax = axes[0, 0]
     tecnologias = ['Vermicompostagem', 'Termofílica']
-    evitadas = [results['vermicomposting']['avoided_co2eq_t'], 
-                results['thermophilic']['avoided_co2eq_t']]
+    evitadas = [evitado_vermi, evitado_thermo]
     
     bars = ax.bar(tecnologias, evitadas, color=['green', 'blue'])
     ax.set_ylabel('Emissões Evitadas (tCO₂eq)')
     ax.set_title('Emissões Evitadas em 20 anos')
     ax.grid(True, alpha=0.3)
     
-    for bar, val in zip(bars, evitadas):
-        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + max(evitadas)*0.02,
-                f'{val:.1f}', ha='center', va='bottom')
+    ax.bar_label(bars, fmt='%.1f', padding=3)
     
     # 2. Detalhamento das emissões por fonte
     ax = axes[0, 1]
     categorias = ['Baseline\nCH₄', 'Baseline\nN₂O', 'Vermi\nCH₄', 'Vermi\nN₂O', 
                   'Termo\nCH₄', 'Termo\nN₂O']
-    emissoes = [
-        results['baseline']['ch4_kg'] * calculator.GWP_CH4_20 / 1000,
-        results['baseline']['n2o_kg'] * calculator.GWP_N2O_20 / 1000,
-        results['vermicomposting']['ch4_kg'] * calculator.GWP_CH4_20 / 1000,
-        results['vermicomposting']['n2o_kg'] * calculator.GWP_N2O_20 / 1000,
-        results['thermophilic']['ch4_kg'] * calculator.GWP_CH4_20 / 1000,
-        results['thermophilic']['n2o_kg'] * calculator.GWP_N2O_20 / 1000
-    ]
+    # Matriz (cenário x gás) em kg multiplicada de uma vez pelos fatores de GWP (t CO2eq/kg),
+    # achatada na mesma ordem das categorias
+    gases_kg = np.array([[results[c]['ch4_kg'], results[c]['n2o_kg']]
+                         for c in ('baseline', 'vermicomposting', 'thermophilic')])
+    emissoes = (gases_kg * (np.array([calculator.GWP_CH4_20, calculator.GWP_N2O_20]) / 1000)).ravel()
     
     cores = ['red', 'darkred', 'green', 'darkgreen', 'blue', 'darkblue']
     bars = ax.bar(categorias, emissoes, color=cores)
@@ -547,13 +688,13 @@ def create_dashboard(results, sensitivity, mc_vermi, mc_thermo, total_waste_tons
     
     # 4. Distribuições Monte Carlo
     ax = axes[1, 0]
-    sns.histplot(mc_vermi, kde=True, color='green', label='Vermicompostagem', alpha=0.6, ax=ax)
-    sns.histplot(mc_thermo, kde=True, color='blue', label='Termofílica', alpha=0.6, ax=ax)
+    _plot_hist_kde(ax, mc_vermi, 'green', 'Vermicompostagem')
+    _plot_hist_kde(ax, mc_thermo, 'blue', 'Termofílica')
     
-    ax.axvline(results['vermicomposting']['avoided_co2eq_t'], color='green', linestyle='--',
-               label=f'Média Vermi: {results["vermicomposting"]["avoided_co2eq_t"]:.1f}')
-    ax.axvline(results['thermophilic']['avoided_co2eq_t'], color='blue', linestyle='--',
-               label=f'Média Termo: {results["thermophilic"]["avoided_co2eq_t"]:.1f}')
+    ax.axvline(evitado_vermi, color='green', linestyle='--',
+               label=f'Média Vermi: {evitado_vermi:.1f}')
+    ax.axvline(evitado_thermo, color='blue', linestyle='--',
+               label=f'Média Termo: {evitado_thermo:.1f}')
     
     ax.set_xlabel('Emissões Evitadas (tCO₂eq)')
     ax.set_ylabel('Frequência')
@@ -563,8 +704,8 @@ def create_dashboard(results, sensitivity, mc_vermi, mc_thermo, total_waste_tons
     
     # 5. Fatores de emissão por tonelada de resíduo
     ax = axes[1, 1]
-    fator_vermi = results['vermicomposting']['avoided_co2eq_t'] / total_waste_tons
-    fator_thermo = results['thermophilic']['avoided_co2eq_t'] / total_waste_tons
+    fator_vermi = evitado_vermi / total_waste_tons
+    fator_thermo = evitado_thermo / total_waste_tons
     
     fatores = [fator_vermi, fator_thermo]
     tecnologias = ['Vermicompostagem', 'Termofílica']
@@ -574,13 +715,12 @@ def create_dashboard(results, sensitivity, mc_vermi, mc_thermo, total_waste_tons
     ax.set_title('Fatores de Emissão por Tonelada de Resíduo')
     ax.grid(True, alpha=0.3)
     
-    for bar, fator in zip(bars, fatores):
-        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + max(fatores)*0.02,
-                f'{fator:.3f}', ha='center', va='bottom')
+    ax.bar_label(bars, fmt='%.3f', padding=3)
     
     # 6. Métricas resumidas
     ax = axes[1, 2]
     ax.axis('off')
+    st_vermi = sensitivity['vermi']['ST']
     
     texto_resumo = f"""
     RESUMO DAS MÉTRICAS
@@ -588,12 +728,12 @@ def create_dashboard(results, sensitivity, mc_vermi, mc_thermo, total_waste_tons
     Total de Resíduos: {total_waste_tons:.0f} t
     
     VERMICOMPOSTAGEM:
-    • Evitado: {results['vermicomposting']['avoided_co2eq_t']:.1f} tCO₂eq
+    • Evitado: {evitado_vermi:.1f} tCO₂eq
     • Anual: {results['annual_averages']['vermi_avoided_year']:.2f} tCO₂eq/ano
     • Por ton: {fator_vermi:.3f} tCO₂eq/t
     
     TERMOFÍLICA:
-    • Evitado: {results['thermophilic']['avoided_co2eq_t']:.1f} tCO₂eq
+    • Evitado: {evitado_thermo:.1f} tCO₂eq
     • Anual: {results['annual_averages']['thermo_avoided_year']:.2f} tCO₂eq/ano
     • Por ton: {fator_thermo:.3f} tCO₂eq/t
     
@@ -602,41 +742,39 @@ def create_dashboard(results, sensitivity, mc_vermi, mc_thermo, total_waste_tons
     • Superioridade: {results['comparison']['superiority_percent']:.1f}%
     
     SENSIBILIDADE (Vermi ST):
-    • T: {sensitivity['vermi']['ST'][0]:.3f}
-    • U: {sensitivity['vermi']['ST'][1]:.3f}
-    • fCH₄: {sensitivity['vermi']['ST'][2]:.3f}
-    • fN₂O: {sensitivity['vermi']['ST'][3]:.3f}
-    • GWP_CH₄: {sensitivity['vermi']['ST'][4]:.3f}
-    • GWP_N₂O: {sensitivity['vermi']['ST'][5]:.3f}
+    • T: {st_vermi[0]:.3f}
+    • U: {st_vermi[1]:.3f}
+    • fCH₄: {st_vermi[2]:.3f}
+    • fN₂O: {st_vermi[3]:.3f}
+    • GWP_CH₄: {st_vermi[4]:.3f}
+    • GWP_N₂O: {st_vermi[5]:.3f}
     """
     
     ax.text(0.05, 0.95, texto_resumo, fontsize=9, family='monospace',
             verticalalignment='top', transform=ax.transAxes)
     
-    plt.suptitle('Resultados da Análise de Emissões de GEE', fontsize=16, fontweight='bold')
-    plt.tight_layout()
+    fig.suptitle('Resultados da Análise de Emissões de GEE', fontsize=16, fontweight='bold')
+    fig.tight_layout()
     return fig
 
-def create_emissions_accumulated_plot(results):
-    """Gráfico de emissões acumuladas ao longo do tempo."""
-    fig, ax = plt.subplots(figsize=(10, 6))
+def render_emissions_accumulated_chart(results):
+    """Gráfico de emissões acumuladas ao longo do tempo (Vega-Lite, desenhado no navegador)."""
     df_detalhado = results['detailed_data']['daily']
-    ax.plot(df_detalhado['Data'], df_detalhado['Total_Aterro_tCO2eq_acum'], 
-            label='Baseline (Aterro)', color='red', linewidth=2)
-    ax.plot(df_detalhado['Data'], df_detalhado['Total_Vermi_tCO2eq_acum'], 
-            label='Vermicompostagem', color='green', linewidth=2)
-    ax.plot(df_detalhado['Data'], df_detalhado['Total_Thermo_tCO2eq_acum'], 
-            label='Termofílica', color='blue', linewidth=2)
-    ax.set_xlabel('Data')
-    ax.set_ylabel('Emissões Acumuladas (tCO₂eq)')
-    ax.set_title('Emissões Acumuladas de GEE ao Longo do Tempo')
-    ax.legend()
-    ax.grid(True, alpha=0.3)
-    return fig
+    # ~2000 pontos bastam na resolução de tela (mantendo sempre o último dia)
+    passo = max(1, len(df_detalhado) // 2000)
+    df_plot = df_detalhado.iloc[np.unique(np.r_[0:len(df_detalhado):passo, len(df_detalhado) - 1])]
+    # float32 basta na tela e reduz pela metade o payload enviado ao navegador
+    df_plot = df_plot.set_index('Data')[
+        ['Total_Aterro_tCO2eq_acum', 'Total_Vermi_tCO2eq_acum', 'Total_Thermo_tCO2eq_acum']
+    ].set_axis(['Baseline (Aterro)', 'Vermicompostagem', 'Termofílica'], axis=1).astype(np.float32)
+    st.markdown("**Emissões Acumuladas de GEE ao Longo do Tempo**")
+    st.line_chart(df_plot, color=['#ff0000', '#008000', '#0000ff'],
+                  x_label='Data', y_label='Emissões Acumuladas (tCO₂eq)')
 
 def create_annual_emissions_plot(results):
     """Gráfico de barras anuais."""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig = _nova_figura(figsize=(10, 6))
+    ax = fig.subplots()
     df_anual = results['detailed_data']['annual']
     x = np.arange(len(df_anual))
     width = 0.25
@@ -652,15 +790,14 @@ def create_annual_emissions_plot(results):
     ax.set_xticklabels(df_anual['Ano'].astype(str), rotation=45)
     ax.legend()
     ax.grid(True, alpha=0.3)
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
-def create_tornado_plot(sensitivity):
-    """Gráfico de tornado para sensibilidade."""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    params = ['T', 'U', 'fCH4', 'fN2O', 'GWP_CH4', 'GWP_N2O']
-    vermi_st = sensitivity['vermi']['ST']
-    thermo_st = sensitivity['thermo']['ST']
+def create_tornado_plot(vermi_st, thermo_st):
+    """Gráfico de tornado para sensibilidade (índices ST de cada tecnologia)."""
+    fig = _nova_figura(figsize=(10, 6))
+    ax = fig.subplots()
+    params = PROBLEMA_SOBOL['names']
     
     y_pos = np.arange(len(params))
     
@@ -673,9 +810,79 @@ def create_tornado_plot(sensitivity):
     ax.set_yticklabels(params)
     ax.legend()
     ax.grid(True, alpha=0.3, axis='x')
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
+def metric_card_html(rotulo, valor, delta=None):
+    """Cartão de métrica em HTML (classes .metric-card/.metric-* definidas no CSS do app)."""
+    # Mesma convenção de cor do st.metric: verde para delta positivo, vermelho para negativo
+    classe = 'metric-delta negativo' if delta and delta.startswith('-') else 'metric-delta'
+    linha_delta = f'<div class="{classe}">{delta}</div>' if delta else ''
+    return (f'<div class="metric-card"><div class="metric-label">{rotulo}</div>'
+            f'<div class="metric-value">{valor}</div>{linha_delta}</div>')
+
+def get_cached_figure_png(sim, nome, construtor, *args):
+    """PNG da figura `nome` da simulação em `sim`, renderizado na primeira exibição e reaproveitado depois.
+    
+    As figuras dependem só dos resultados da simulação, que já ficam em st.session_state sob a
+    chave das entradas: guardar os bytes do PNG evita refazer o layout e a rasterização do
+    Matplotlib (savefig) a cada rerun.
+    """
+    figuras = sim['figuras']
+    if nome not in figuras:
+        fig = construtor(*args)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', bbox_inches='tight')
+        figuras[nome] = buffer.getvalue()
+    return figuras[nome]
+
+# Abas de gráficos adicionais: rótulo -> função que desenha a aba a partir de `sim`
+ABAS_GRAFICOS = {
+    "📈 Emissões Acumuladas": lambda sim: render_emissions_accumulated_chart(sim['results']),
+    "📅 Emissões Anuais": lambda sim: st.image(
+        get_cached_figure_png(sim, 'anuais', create_annual_emissions_plot, sim['results']),
+        width="stretch"),
+    "🎲 Análise de Sensibilidade": lambda sim: st.image(
+        get_cached_figure_png(sim, 'tornado', create_tornado_plot,
+                              sim['sensitivity']['vermi']['ST'], sim['sensitivity']['thermo']['ST']),
+        width="stretch"),
+}
+
+@st.fragment
+def render_chart_tabs(sim):
+    """Gráficos adicionais, com apenas a aba ativa construída e renderizada.
+    
+    O seletor escolhe uma entrada de ABAS_GRAFICOS; trocar de aba reexecuta só este fragmento.
+    """
+    aba = st.radio("Gráfico", list(ABAS_GRAFICOS), horizontal=True, key='aba_graficos',
+                   label_visibility='collapsed')
+    ABAS_GRAFICOS[aba](sim)
+
+def get_cached_csv(sim, nome, df):
+    """Bytes CSV (UTF-8) da tabela `nome` da simulação em `sim`, serializados uma única vez."""
+    exportacoes = sim['exportacoes']
+    if nome not in exportacoes:
+        exportacoes[nome] = df.to_csv(index=False).encode('utf-8')
+    return exportacoes[nome]
+
+@st.fragment
+def render_export_section(sim):
+    """Seção de exportação em CSV.
+    
+    Como fragmento, o clique num botão de download reexecuta só esta seção, sem redesenhar
+    as métricas e os gráficos do restante da página; os CSVs ficam guardados junto da simulação
+    e não são regerados a cada rerun.
+    """
+    dados = sim['results']['detailed_data']
+    st.subheader("📥 Exportar Dados")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Baixar dados diários (CSV)", get_cached_csv(sim, 'diario', dados['daily']),
+                           "emissoes_diarias.csv", "text/csv")
+    with col2:
+        st.download_button("Baixar dados anuais (CSV)", get_cached_csv(sim, 'anual', dados['annual']),
+                           "emissoes_anuais.csv", "text/csv")
+
 # =============================================================================
 # FUNÇÃO PRINCIPAL STREAMLIT
 # =============================================================================
@@ -706,6 +913,19 @@ def main():
             padding: 15px;
             box-shadow: 0 2px 4px rgba(0,0,0,0.1);
         }
+        /* Cartões de fundo branco: cor do texto explícita para não herdar o texto claro do tema escuro;
+           colunas se reorganizam (até uma por linha) em telas estreitas */
+        .metric-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(220px, 1fr));
+            gap: 1rem;
+            margin-bottom: 1rem;
+        }
+        .metric-grid .metric-card { color: #262730; }
+        .metric-label { font-size: 0.875rem; color: #555; }
+        .metric-value { font-size: 2rem; font-weight: 600; color: #262730; }
+        .metric-delta { font-size: 0.875rem; color: #2e7d32; }
+        .metric-delta.negativo { color: #c62828; }
         </style>
     """, unsafe_allow_html=True)
     
@@ -714,7 +934,9 @@ def main():
     st.markdown("---")
     
     # Sidebar - Parâmetros de entrada
-    with st.sidebar:
+    # Num st.form, as edições só disparam um rerun ao clicar em "Executar Análise"
+    # (um rerun por lote de alterações, e os resultados exibidos não somem durante a edição)
+    with st.sidebar.form("parametros_entrada"):
         st.header("📊 Parâmetros de Entrada")
         st.markdown("**Dados de Resíduos**")
         waste_kg_day = st.number_input("Resíduos diários (kg/dia)", min_value=1, max_value=100000, value=100, step=10)
@@ -741,17 +963,26 @@ def main():
             prob_real /= total_prob
             prob_pessimista /= total_prob
         
-        run_button = st.button("▶️ Executar Análise", use_container_width=True)
+        run_button = st.form_submit_button("▶️ Executar Análise", width="stretch")
     
-    if run_button:
+    # Resultados ficam em st.session_state, associados às entradas que os geraram: reruns sem
+    # mudança de parâmetros (ex.: clique em download) reaproveitam a simulação em vez de descartá-la
+    # O ano inicial das séries entra na chave (e no cache da análise determinística), para que
+    # resultados de um ano anterior não sejam reaproveitados após a virada do ano
+    ano_inicio = datetime.now().year
+    sim_key = (waste_kg_day, years, k_year, temperature, doc_fraction, moisture,
+               prob_otimista, prob_real, prob_pessimista, ano_inicio)
+    
+    if run_button and st.session_state.get('sim_key') != sim_key:
         with st.spinner("Processando dados e executando cálculos..."):
             # Instanciar calculadora
             calculator = GHGEmissionCalculator()
             
             # Calcular resultados determinísticos para cenário realista (padrão)
-            results = calculator.calculate_avoided_emissions(
-                waste_kg_day, k_year, temperature, doc_fraction, moisture, years,
-                gwp_ch4=27.0, gwp_n2o=273  # cenário realista
+            results = run_deterministic_analysis(
+                calculator, waste_kg_day, k_year, temperature, doc_fraction, moisture, years,
+                gwp_ch4=27.0, gwp_n2o=273,  # cenário realista
+                ano_inicio=ano_inicio
             )
             
             # Análise de sensibilidade
@@ -765,73 +996,86 @@ def main():
                 n_simulations=100,
                 prob_otimista=prob_otimista, prob_real=prob_real, prob_pessimista=prob_pessimista
             )
-            
-            total_waste_tons = waste_kg_day * 365 * years / 1000
-            
-            # Exibir métricas principais
-            st.subheader("📈 Resultados Principais")
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Emissões Evitadas - Vermicompostagem", 
-                          f"{results['vermicomposting']['avoided_co2eq_t']:,.1f} tCO₂eq".replace(',', 'X').replace('.', ',').replace('X', '.'))
-            with col2:
-                st.metric("Emissões Evitadas - Termofílica", 
-                          f"{results['thermophilic']['avoided_co2eq_t']:,.1f} tCO₂eq".replace(',', 'X').replace('.', ',').replace('X', '.'))
-            with col3:
-                diff = results['comparison']['difference_tco2eq']
-                sup = results['comparison']['superiority_percent']
-                st.metric("Superioridade Vermicompostagem", 
-                          f"{sup:.1f}%", delta=f"{diff:+.1f} tCO₂eq")
-            
-            # Painel principal
-            st.subheader("📊 Painel de Resultados")
-            fig_dashboard = create_dashboard(results, sensitivity, mc_vermi, mc_thermo, total_waste_tons, calculator)
-            st.pyplot(fig_dashboard)
-            
-            # Gráficos adicionais em abas
-            tab1, tab2, tab3 = st.tabs(["📈 Emissões Acumuladas", "📅 Emissões Anuais", "🎲 Análise de Sensibilidade"])
-            with tab1:
-                fig_acum = create_emissions_accumulated_plot(results)
-                st.pyplot(fig_acum)
-            with tab2:
-                fig_annual = create_annual_emissions_plot(results)
-                st.pyplot(fig_annual)
-            with tab3:
-                fig_tornado = create_tornado_plot(sensitivity)
-                st.pyplot(fig_tornado)
-            
-            # Exibir estatísticas do Monte Carlo
-            st.subheader("🎲 Estatísticas da Simulação Monte Carlo")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("**Vermicompostagem**")
-                st.write(f"Média: {np.mean(mc_vermi):.1f} tCO₂eq")
-                st.write(f"Desvio Padrão: {np.std(mc_vermi):.1f} tCO₂eq")
-                st.write(f"Percentil 5: {np.percentile(mc_vermi, 5):.1f} tCO₂eq")
-                st.write(f"Percentil 95: {np.percentile(mc_vermi, 95):.1f} tCO₂eq")
-            with col2:
-                st.markdown("**Termofílica**")
-                st.write(f"Média: {np.mean(mc_thermo):.1f} tCO₂eq")
-                st.write(f"Desvio Padrão: {np.std(mc_thermo):.1f} tCO₂eq")
-                st.write(f"Percentil 5: {np.percentile(mc_thermo, 5):.1f} tCO₂eq")
-                st.write(f"Percentil 95: {np.percentile(mc_thermo, 95):.1f} tCO₂eq")
-            
-            prob_vermi_melhor = np.mean(mc_vermi > mc_thermo) * 100
-            st.success(f"✅ Probabilidade de a vermicompostagem superar a termofílica: **{prob_vermi_melhor:.1f}%**")
-            
-            # Opção de download dos dados
-            st.subheader("📥 Exportar Dados")
-            df_daily = results['detailed_data']['daily']
-            df_annual = results['detailed_data']['annual']
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                csv_daily = df_daily.to_csv(index=False).encode('utf-8')
-                st.download_button("Baixar dados diários (CSV)", csv_daily, "emissoes_diarias.csv", "text/csv")
-            with col2:
-                csv_annual = df_annual.to_csv(index=False).encode('utf-8')
-                st.download_button("Baixar dados anuais (CSV)", csv_annual, "emissoes_anuais.csv", "text/csv")
+        
+        # A sensibilidade de Sobol só depende do resíduo diário e do horizonte: se os índices ST não
+        # mudaram, o PNG do tornado da simulação anterior continua válido e é herdado
+        figuras = {}
+        anterior = st.session_state.get('sim')
+        if (anterior is not None and 'tornado' in anterior['figuras']
+                and all(np.array_equal(anterior['sensitivity'][t]['ST'], sensitivity[t]['ST'])
+                        for t in ('vermi', 'thermo'))):
+            figuras['tornado'] = anterior['figuras']['tornado']
+        
+        st.session_state['sim_key'] = sim_key
+        st.session_state['sim'] = {
+            'calculator': calculator,
+            'results': results,
+            'sensitivity': sensitivity,
+            'mc_vermi': mc_vermi,
+            'mc_thermo': mc_thermo,
+            'figuras': figuras,
+            'exportacoes': {},
+        }
     
+    if st.session_state.get('sim_key') == sim_key:
+        sim = st.session_state['sim']
+        calculator = sim['calculator']
+        results = sim['results']
+        sensitivity = sim['sensitivity']
+        mc_vermi, mc_thermo = sim['mc_vermi'], sim['mc_thermo']
+        
+        total_waste_tons = waste_kg_day * 365 * years / 1000
+        
+        # Exibir métricas principais
+        evitado_vermi_fmt = formatar_br(results['vermicomposting']['avoided_co2eq_t'])
+        evitado_thermo_fmt = formatar_br(results['thermophilic']['avoided_co2eq_t'])
+        diff = results['comparison']['difference_tco2eq']
+        sup = results['comparison']['superiority_percent']
+        
+        st.subheader("📈 Resultados Principais")
+        # Os três cartões são renderizados juntos, num único bloco HTML com grade responsiva
+        cartoes = "".join(
+            metric_card_html(rotulo, valor, delta) for rotulo, valor, delta in (
+                ("Emissões Evitadas - Vermicompostagem", f"{evitado_vermi_fmt} tCO₂eq", None),
+                ("Emissões Evitadas - Termofílica", f"{evitado_thermo_fmt} tCO₂eq", None),
+                ("Superioridade Vermicompostagem", f"{sup:.1f}%", f"{diff:+.1f} tCO₂eq"),
+            )
+        )
+        st.markdown(f'<div class="metric-grid">{cartoes}</div>', unsafe_allow_html=True)
+        
+        # Painel principal
+        st.subheader("📊 Painel de Resultados")
+        st.image(get_cached_figure_png(sim, 'dashboard', create_dashboard, results, sensitivity,
+                                       mc_vermi, mc_thermo, total_waste_tons, calculator),
+                 width="stretch")
+        
+        # Gráficos adicionais em abas
+        render_chart_tabs(sim)
+        
+        # Exibir estatísticas do Monte Carlo
+        st.subheader("🎲 Estatísticas da Simulação Monte Carlo")
+        # Estatísticas das duas tecnologias calculadas de uma vez (linha 0: vermi, linha 1: termo),
+        # em float64 contíguo para que as reduções não façam cópias/conversões internas
+        mc_stack = np.ascontiguousarray(np.vstack([mc_vermi, mc_thermo]), dtype=np.float64)
+        mc_media = mc_stack.mean(axis=1)
+        mc_desvio = mc_stack.std(axis=1)
+        mc_p5, mc_p95 = np.percentile(mc_stack, [5, 95], axis=1)
+        
+        # Tabela estática: linhas são as estatísticas, colunas as tecnologias
+        mc_estatisticas = np.vstack([mc_media, mc_desvio, mc_p5, mc_p95])
+        st.table(pd.DataFrame(
+            np.char.add(np.char.mod('%.1f', mc_estatisticas), ' tCO₂eq'),
+            index=["Média", "Desvio Padrão", "Percentil 5", "Percentil 95"],
+            columns=["Vermicompostagem", "Termofílica"],
+        ))
+        
+        diferencas = np.subtract(mc_stack[0], mc_stack[1])
+        prob_vermi_melhor = np.mean(diferencas > 0) * 100
+        st.success(f"✅ Probabilidade de a vermicompostagem superar a termofílica: **{prob_vermi_melhor:.1f}%**")
+        
+        # Opção de download dos dados
+        render_export_section(sim)
+
     else:
         st.info("👈 Configure os parâmetros na barra lateral e clique em 'Executar Análise' para começar.")
         st.markdown("""